@@ -4,13 +4,30 @@ import os
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
 class LoggerClient:
-    def __init__(self, service_name, logger_url=None):
+    def __init__(self, service_name, logger_url=None, level=None):
         self.service_name = service_name
         self.logger_url = logger_url or os.environ.get("LOGGER_SERVICE_URL", "http://localhost:7000")
+        self.level = LOG_LEVELS.get((level or os.environ.get("LOG_LEVEL", "DEBUG")).upper(), LOG_LEVELS["DEBUG"])
     
-    def _send_log(self, level, message, details=None):
+    def _send_log(self, level, message, args=(), details=None):
+        # Skip formatting and the HTTP call entirely for levels below the threshold
+        if LOG_LEVELS[level] < self.level:
+            return False
         try:
+            if args:
+                try:
+                    message = message % args
+                except (TypeError, ValueError):
+                    if len(args) == 1 and details is None:
+                        # The original info(message, details) call style
+                        details = args[0]
+                    else:
+                        # Like stdlib logging, a bad format string must not break the
+                        # caller; keep the arguments rather than dropping them
+                        message = f"{message} {args!r}"
             log_data = {
                 "service": self.service_name,
                 "level": level,
@@ -29,14 +46,14 @@ class LoggerClient:
             print(f"{level} - {message} - {details}")
             return False
     
-    def info(self, message, details=None):
-        return self._send_log("INFO", message, details)
+    def info(self, message, *args, details=None):
+        return self._send_log("INFO", message, args, details)
     
-    def error(self, message, details=None):
-        return self._send_log("ERROR", message, details)
+    def error(self, message, *args, details=None):
+        return self._send_log("ERROR", message, args, details)
     
-    def warning(self, message, details=None):
-        return self._send_log("WARNING", message, details)
+    def warning(self, message, *args, details=None):
+        return self._send_log("WARNING", message, args, details)
     
-    def debug(self, message, details=None):
-        return self._send_log("DEBUG", message, details)
+    def debug(self, message, *args, details=None):
+        return self._send_log("DEBUG", message, args, details)
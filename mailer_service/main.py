@@ -1,18 +1,29 @@
 # email_service/main.py
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks
+import asyncio
 import smtplib
 import os
+import re
+import queue
+import atexit
+import threading
 import traceback
+from contextlib import contextmanager
+import email.policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from dotenv import load_dotenv
 from common_utils.logger.client import LoggerClient
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, Undefined, select_autoescape
+from jinja2.sandbox import SandboxedEnvironment
 import pathlib
 
+load_dotenv()
+
 # Set up template directory
 TEMPLATE_DIR = pathlib.Path(__file__).parent / "templates"
 TEMPLATE_DIR.mkdir(exist_ok=True)
@@ -20,92 +31,333 @@ TEMPLATE_DIR.mkdir(exist_ok=True)
 # Initialize Jinja2 environment
 template_env = Environment(
     loader=FileSystemLoader(TEMPLATE_DIR),
-    autoescape=select_autoescape(['html', 'xml'])
+    autoescape=select_autoescape(['html', 'xml']),
+    cache_size=400,
+    auto_reload=False,
+    # Compiled template bytecode is shared across workers and restarts;
+    # defaults to a per-user directory under the system temp dir
+    bytecode_cache=FileSystemBytecodeCache(os.environ.get("JINJA_CACHE_DIR"))
 )
 
-load_dotenv()
+class LiteralUndefined(Undefined):
+    """Render a missing subject variable as its original {{name}} placeholder"""
+    def __str__(self):
+        return f"{{{{{self._undefined_name}}}}}"
+
+# Default subjects are plain text header values, so they are compiled without HTML
+# autoescaping; sandboxed as a second line of defence, they are never caller-supplied
+subject_env = SandboxedEnvironment(autoescape=False, undefined=LiteralUndefined)
+# Subjects with exactly one plain {{variable}} and no other Jinja syntax
+SINGLE_VARIABLE_SUBJECT = re.compile(r"([^{]*)\{\{\s*(\w+)\s*\}\}([^{]*)")
+
 logger = LoggerClient("mailer-service")
 app = FastAPI(title="Email Service", description="Email Sending Microservice")
 
 # Email configuration
+@dataclass(slots=True, frozen=True)
 class EmailConfig:
-    def __init__(self):
-        self.smtp_server = os.environ.get("SMTP_SERVER", "sandbox.smtp.mailtrap.io").strip("'")
-        self.smtp_port = int(os.environ.get("SMTP_PORT", 2525))
-        self.smtp_username = os.environ.get("SMTP_USERNAME", "").strip("'")
-        self.smtp_password = os.environ.get("SMTP_PASSWORD", "").strip("'")
-        self.default_sender = os.environ.get("DEFAULT_SENDER", "payment@example.com")
+    smtp_server: str = "sandbox.smtp.mailtrap.io"
+    smtp_port: int = 2525
+    smtp_username: str = ""
+    smtp_password: str = ""
+    default_sender: str = "payment@example.com"
+    
+    @classmethod
+    def from_env(cls):
+        """Build the configuration from the SMTP_* and DEFAULT_SENDER environment variables"""
+        env = os.environ
+        config = cls(
+            smtp_server=env.get("SMTP_SERVER", "sandbox.smtp.mailtrap.io").strip("'"),
+            smtp_port=int(env.get("SMTP_PORT", 2525)),
+            smtp_username=env.get("SMTP_USERNAME", "").strip("'"),
+            smtp_password=env.get("SMTP_PASSWORD", "").strip("'"),
+            default_sender=env.get("DEFAULT_SENDER", "payment@example.com")
+        )
         
-        logger.info(f"SMTP Configuration: {self.smtp_server}:{self.smtp_port}")
+        logger.info("SMTP Configuration: %s:%s", config.smtp_server, config.smtp_port)
+        return config
+
+# SMTP client with RFC 2920 command pipelining
+class PipeliningSMTP(smtplib.SMTP):
+    @staticmethod
+    def _options(options):
+        return " " + " ".join(options) if options else ""
+
+    def _abort_transaction(self, code, data_code):
+        # A 354 means the server is waiting for the message, so end it empty first
+        if data_code == 354:
+            self.send(b"." + smtplib.bCRLF)
+            self.getreply()
+        if code == 421:
+            self.close()
+        else:
+            self._rset()
+
+    def sendmail(self, from_addr, to_addrs, msg, mail_options=(), rcpt_options=()):
+        """Send MAIL FROM, RCPT TO and DATA in one batch when the server supports PIPELINING"""
+        self.ehlo_or_helo_if_needed()
+        if not self.has_extn("pipelining"):
+            return super().sendmail(from_addr, to_addrs, msg, mail_options, rcpt_options)
+        
+        if isinstance(msg, str):
+            msg = smtplib._fix_eols(msg).encode("ascii")
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        esmtp_opts = []
+        if self.has_extn("size"):
+            esmtp_opts.append("size=%d" % len(msg))
+        esmtp_opts.extend(mail_options)
+        
+        self.putcmd("mail", "from:%s%s" % (smtplib.quoteaddr(from_addr), self._options(esmtp_opts)))
+        for addr in to_addrs:
+            self.putcmd("rcpt", "to:%s%s" % (smtplib.quoteaddr(addr), self._options(rcpt_options)))
+        self.putcmd("data")
+        
+        # Collect the replies in the order the commands were sent
+        mail_code, mail_resp = self.getreply()
+        senderrs = {}
+        rcpt_codes = []
+        for addr in to_addrs:
+            code, resp = self.getreply()
+            rcpt_codes.append(code)
+            if code not in (250, 251):
+                senderrs[addr] = (code, resp)
+        data_code, data_resp = self.getreply()
+        
+        if mail_code != 250:
+            self._abort_transaction(mail_code, data_code)
+            raise smtplib.SMTPSenderRefused(mail_code, mail_resp, from_addr)
+        if 421 in rcpt_codes or len(senderrs) == len(to_addrs):
+            self._abort_transaction(421 if 421 in rcpt_codes else None, data_code)
+            raise smtplib.SMTPRecipientsRefused(senderrs)
+        if data_code != 354:
+            self._abort_transaction(data_code, None)
+            raise smtplib.SMTPDataError(data_code, data_resp)
+        
+        payload = smtplib._quote_periods(msg)
+        if payload[-2:] != smtplib.bCRLF:
+            payload += smtplib.bCRLF
+        self.send(payload + b"." + smtplib.bCRLF)
+        code, resp = self.getreply()
+        if code != 250:
+            self._abort_transaction(code, None)
+            raise smtplib.SMTPDataError(code, resp)
+        return senderrs
+
+# SMTP connection pool
+class SMTPConnectionPool:
+    def __init__(self, config, size=None):
+        self.config = config
+        self.size = size or int(os.environ.get("SMTP_POOL_SIZE", 4))
+        self._idle = queue.Queue(maxsize=self.size)
+        # smtplib's protocol trace goes to stderr, so only enable it when asked
+        self._debug = bool(os.environ.get("SMTP_DEBUG"))
+
+    def _connect(self):
+        """Open and authenticate a new SMTP session"""
+        logger.info("Connecting to SMTP server: %s:%s", self.config.smtp_server, self.config.smtp_port)
+        server = PipeliningSMTP(self.config.smtp_server, self.config.smtp_port, timeout=30)
+        if self._debug:
+            server.set_debuglevel(1)
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+        server.login(self.config.smtp_username, self.config.smtp_password)
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def acquire(self):
+        """Borrow an authenticated SMTP session, reconnecting if the idle one went stale"""
+        try:
+            server = self._idle.get_nowait()
+            # A server that timed out the session answers NOOP with 421 instead of raising
+            try:
+                alive = server.noop()[0] == 250
+            except Exception:
+                alive = False
+            if not alive:
+                self._close(server)
+                server = self._connect()
+        except queue.Empty:
+            server = self._connect()
+
+        try:
+            yield server
+        except Exception:
+            # The session may be mid-transaction, so do not hand it out again
+            self._close(server)
+            raise
+        self.release(server)
+
+    def release(self, server):
+        """Return a session to the pool, closing it if the pool is full"""
+        try:
+            self._idle.put_nowait(server)
+        except queue.Full:
+            self._close(server)
+
+    def close(self):
+        """Quit all idle sessions"""
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+# compat32 header handling, but with the CRLF line endings SMTP expects on the wire
+SMTP_POLICY = email.policy.compat32.clone(linesep="\r\n")
+
+# Reusable MIME skeleton, one per thread so concurrent sends never share it
+_mime_local = threading.local()
+
+def build_msg(subject, from_addr, to_hdr, html, text, cc_hdr=None, bcc_hdr=None):
+    """Fill this thread's multipart/alternative skeleton; serialize it before the next call"""
+    msg = getattr(_mime_local, "msg", None)
+    if msg is None:
+        msg = MIMEMultipart("alternative", policy=SMTP_POLICY)
+        msg.attach(MIMEText("", "plain", "utf-8", policy=SMTP_POLICY))
+        msg.attach(MIMEText("", "html", "utf-8", policy=SMTP_POLICY))
+        _mime_local.msg = msg
+    
+    for name, value in (("Subject", subject), ("From", from_addr), ("To", to_hdr)):
+        del msg[name]
+        if value is not None:
+            msg[name] = value
+    # Cc and Bcc are only written when there are addresses for them
+    for name, value in (("Cc", cc_hdr), ("Bcc", bcc_hdr)):
+        del msg[name]
+        if value:
+            msg[name] = value
+    
+    text_part, html_part = msg.get_payload()
+    for part, content in ((text_part, text), (html_part, html)):
+        # set_payload only re-encodes the body when no transfer encoding is set yet
+        del part["Content-Transfer-Encoding"]
+        part.set_payload(content, "utf-8")
+    return msg
+
+def _as_list(addresses):
+    """Normalize a single address, a list of addresses or None to a list"""
+    if addresses is None:
+        return []
+    if isinstance(addresses, str):
+        return [addresses]
+    return list(addresses)
 
 # Email sender class
 class EmailSender:
     def __init__(self, config=None):
-        self.config = config or EmailConfig()
+        self.config = config or EmailConfig.from_env()
+        self.pool = SMTPConnectionPool(self.config)
+    
+    def _prepare(self, to_emails, subject, html_content, text_content=None, from_email=None, cc=None, bcc=None):
+        """Build and serialize a message, returning (from_addr, recipients, raw_message)"""
+        to, cc, bcc = _as_list(to_emails), _as_list(cc), _as_list(bcc)
+        from_addr = from_email or self.config.default_sender
+        
+        msg = build_msg(
+            subject,
+            from_addr,
+            ", ".join(to),
+            html_content,
+            text_content or "Please use an HTML-compatible email client to view this message.",
+            cc_hdr=", ".join(cc),
+            bcc_hdr=", ".join(bcc)
+        )
+        # Serialize now: the skeleton is reused by the next message on this thread
+        return from_addr, to + cc + bcc, msg.as_bytes()
     
     def send_email(self, to_emails, subject, html_content, text_content=None, from_email=None, cc=None, bcc=None):
         if not to_emails:
             logger.error("No recipients specified")
             return False
             
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_email or self.config.default_sender
-        msg["To"] = ", ".join(to_emails) if isinstance(to_emails, list) else to_emails
-        
-        # Add CC and BCC
-        if cc:
-            msg["Cc"] = ", ".join(cc) if isinstance(cc, list) else cc
-        if bcc:
-            msg["Bcc"] = ", ".join(bcc) if isinstance(bcc, list) else bcc
-        
-        if text_content:
-            msg.attach(MIMEText(text_content, "plain", "utf-8"))
-        else:
-            msg.attach(MIMEText("Please use an HTML-compatible email client to view this message.", "plain", "utf-8"))
-        
-        msg.attach(MIMEText(html_content, "html", "utf-8"))
-        
         try:
-            logger.info(f"Connecting to SMTP server: {self.config.smtp_server}:{self.config.smtp_port}")
+            from_addr, all_recipients, raw = self._prepare(
+                to_emails, subject, html_content, text_content, from_email, cc, bcc
+            )
             
             if os.environ.get("TESTING") == "True":
-                logger.info(f"[TEST MODE] Would send email to {to_emails} with subject: {subject}")
+                logger.info("[TEST MODE] Would send email to %s with subject: %s", to_emails, subject)
                 return True
-                
-            server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port, timeout=30)
-            server.set_debuglevel(1)
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            server.login(self.config.smtp_username, self.config.smtp_password)
             
-            # Get all recipients (including CC and BCC)
-            all_recipients = to_emails.copy() if isinstance(to_emails, list) else [to_emails]
-            if cc:
-                all_recipients.extend(cc if isinstance(cc, list) else [cc])
-            if bcc:
-                all_recipients.extend(bcc if isinstance(bcc, list) else [bcc])
+            with self.pool.acquire() as server:
+                server.sendmail(from_addr, all_recipients, raw)
             
-            server.sendmail(msg["From"], all_recipients, msg.as_string())
-            server.quit()
-            
-            logger.info(f"Email sent successfully to {to_emails}")
+            logger.info("Email sent successfully to %s", to_emails)
             return True
         except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
+            logger.error("Failed to send email: %s", e)
             logger.error(traceback.format_exc())
             return False
+    
+    def send_bulk(self, messages):
+        """Send several emails over a single pooled SMTP session
+        
+        Each message is a dict of send_email keyword arguments. Returns one
+        success flag per message.
+        """
+        results = [False] * len(messages)
+        prepared = []
+        for index, message in enumerate(messages):
+            if not message.get("to_emails"):
+                logger.error("No recipients specified")
+                continue
+            try:
+                prepared.append((index, self._prepare(**message)))
+            except Exception as e:
+                # A malformed message only fails itself, not the rest of the batch
+                logger.error("Failed to build email %s: %s", index, e)
+        
+        if os.environ.get("TESTING") == "True":
+            logger.info("[TEST MODE] Would send %s bulk emails", len(prepared))
+            for index, _ in prepared:
+                results[index] = True
+            return results
+        
+        try:
+            with self.pool.acquire() as server:
+                for index, (from_addr, all_recipients, raw) in prepared:
+                    try:
+                        server.sendmail(from_addr, all_recipients, raw)
+                        results[index] = True
+                    except (smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                        # The server rejected this message only; the session is still usable
+                        logger.error("Failed to send email to %s: %s", all_recipients, e)
+            
+            logger.info("Bulk email sent: %s/%s succeeded", sum(results), len(messages))
+        except Exception as e:
+            logger.error("Failed to send bulk email: %s", e)
+            logger.error(traceback.format_exc())
+        return results
 
 # Initialize email sender
-email_config = EmailConfig()
+email_config = EmailConfig.from_env()
 email_sender = EmailSender(email_config)
+atexit.register(email_sender.pool.close)
 
 # Template management
 class TemplateManager:
     def __init__(self):
         self.templates = {}
+        # Compiled Jinja templates keyed by file name, so renders skip the loader
+        self._cache: Dict[str, Template] = {}
+        # Compiled default subject templates keyed by subject source
+        self._subject_cache: Dict[str, Template] = {}
+        # (prefix, variable, suffix) for single-variable subjects, keyed by subject source
+        self._subject_fast: Dict[str, tuple] = {}
+        # Bound (html, text) render functions for the known templates
+        self._renderers: Dict[str, tuple] = {}
         self._load_default_templates()
+        self._warm_templates()
         
     def _load_default_templates(self):
         # Load default template subjects
@@ -132,6 +384,12 @@ class TemplateManager:
                 "subject": "Application Deleted: {{application_id}}"
             }
         }
+        # Flat template_id -> subject lookup for get_template_subject
+        self._subject_for = {
+            template_id: template["subject"]
+            for template_id, template in self.templates.items()
+            if "subject" in template
+        }
         
         # Ensure template files exist
         self._create_default_templates()
@@ -521,22 +779,64 @@ class TemplateManager:
                 with open(text_path, "w") as f:
                     f.write(content["text"])
     
+    def _warm_templates(self):
+        """Compile every known template at startup, bind its render functions and pre-split its subject"""
+        for template_id, template in self.templates.items():
+            match = SINGLE_VARIABLE_SUBJECT.fullmatch(template["subject"])
+            if match:
+                self._subject_fast[template["subject"]] = match.groups()
+            self._renderers[template_id] = (
+                self._get(f"{template_id}.html").render,
+                self._get(f"{template_id}.txt").render
+            )
+
+    def _get(self, name: str) -> Template:
+        """Get a compiled template, loading it on first use"""
+        template = self._cache.get(name)
+        if template is None:
+            template = template_env.get_template(name)
+            self._cache[name] = template
+        return template
+
     def get_template_subject(self, template_id: str) -> str:
         """Get the default subject for a template"""
-        if template_id in self.templates and "subject" in self.templates[template_id]:
-            return self.templates[template_id]["subject"]
-        return "Notification"
+        return self._subject_for.get(template_id, "Notification")
+        
+    def get_compiled_subject(self, subject: str) -> Template:
+        """Get a compiled default subject template, compiling it on first use
         
+        Only pass subjects from self.templates, never caller-supplied text.
+        """
+        template = self._subject_cache.get(subject)
+        if template is None:
+            template = subject_env.from_string(subject)
+            self._subject_cache[subject] = template
+        return template
+
+    def render_subject(self, subject: str, template_data: Dict[str, Any]) -> str:
+        """Render variables in a default subject, skipping Jinja for single-variable subjects"""
+        fast = self._subject_fast.get(subject)
+        if fast is not None:
+            prefix, key, suffix = fast
+            if key in template_data:
+                return f"{prefix}{template_data[key]}{suffix}"
+        return self.get_compiled_subject(subject).render(template_data)
+
     def render_template(self, template_id: str, template_data: Dict[str, Any]):
         """Render template and return HTML and text versions"""
         try:
+            renderers = self._renderers.get(template_id)
+            if renderers is not None:
+                render_html, render_text = renderers
+                return render_html(**template_data), render_text(**template_data)
+            
             # Get HTML template
-            html_template = template_env.get_template(f"{template_id}.html")
+            html_template = self._get(f"{template_id}.html")
             html_content = html_template.render(**template_data)
             
             # Get text template
             try:
-                text_template = template_env.get_template(f"{template_id}.txt")
+                text_template = self._get(f"{template_id}.txt")
                 text_content = text_template.render(**template_data)
             except:
                 # If no text template, generate a simple text version
@@ -544,14 +844,18 @@ class TemplateManager:
             
             return html_content, text_content
         except Exception as e:
-            logger.error(f"Error rendering template {template_id}: {str(e)}")
+            logger.error("Error rendering template %s: %s", template_id, e)
             raise Exception(f"Template rendering error: {str(e)}")
 
 # Initialize template manager
 template_manager = TemplateManager()
 
 # API Models
-class EmailRequest(BaseModel):
+class RequestModel(BaseModel):
+    # Requests are read-only once parsed
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+class EmailRequest(RequestModel):
     to: List[str]
     subject: str
     body: str
@@ -562,7 +866,7 @@ class EmailRequest(BaseModel):
     source_service: str
     attachments: Optional[List[Dict[str, Any]]] = None
 
-class TemplateEmailRequest(BaseModel):
+class TemplateEmailRequest(RequestModel):
     to: List[str]
     template_id: str
     template_data: Dict[str, Any]
@@ -572,47 +876,55 @@ class TemplateEmailRequest(BaseModel):
     sender: Optional[str] = None
     source_service: str
 
-class ApplicationCreatedRequest(BaseModel):
+class EmailResponse(BaseModel):
+    status: str
+    message: str
+
+class ServiceStatusResponse(BaseModel):
+    status: str
+    service: str
+
+class ApplicationCreatedRequest(RequestModel):
     recipient: str
     application_id: str
     service_name: str
     amount: float
 
-class ApplicationRejectedRequest(BaseModel):
+class ApplicationRejectedRequest(RequestModel):
     recipient: str
     application_id: str
     service_name: str
     amount: float
     reason: str
 
-class ApplicationApprovedRequest(BaseModel):
+class ApplicationApprovedRequest(RequestModel):
     recipient: str
     application_id: str
     service_name: str
     amount: float
     payment_id: str
 
-class ApplicationDeletedRequest(BaseModel):
+class ApplicationDeletedRequest(RequestModel):
     recipient: str
     application_id: str
     service_name: str
     amount: float
 
-class PaymentCreatedRequest(BaseModel):
+class PaymentCreatedRequest(RequestModel):
     recipient: str
     payment_id: str
     service_name: str
     amount: float
     due_date: Optional[str] = None
 
-class PaymentSuccessRequest(BaseModel):
+class PaymentSuccessRequest(RequestModel):
     recipient: str
     payment_id: str
     service_name: str
     amount: float
     transaction_id: Optional[str] = None
 
-class PaymentFailedRequest(BaseModel):
+class PaymentFailedRequest(RequestModel):
     recipient: str
     payment_id: str
     service_name: str
@@ -621,17 +933,16 @@ class PaymentFailedRequest(BaseModel):
 
 # API Routes
 @app.get("/")
-def read_root():
-    return {"status": "ok", "service": "email-service"}
+def read_root() -> ServiceStatusResponse:
+    return ServiceStatusResponse(status="ok", service="email-service")
 
 @app.post("/send")
-async def send_email_endpoint(request: EmailRequest):
-    """Send a custom email"""
-    logger.info(f"Sending custom email from {request.source_service} to {request.to}")
+async def send_email_endpoint(request: EmailRequest, background_tasks: BackgroundTasks, response: Response, sync: bool = False) -> EmailResponse:
+    """Send a custom email, queued in the background unless sync is set"""
+    logger.info("Sending custom email from %s to %s", request.source_service, request.to)
     
     html_body = request.html_body or request.body
-    
-    result = email_sender.send_email(
+    email = dict(
         to_emails=request.to,
         subject=request.subject,
         html_content=html_body,
@@ -641,17 +952,25 @@ async def send_email_endpoint(request: EmailRequest):
         bcc=request.bcc
     )
     
+    if not sync:
+        background_tasks.add_task(email_sender.send_email, **email)
+        response.status_code = 202
+        return EmailResponse(status="accepted", message="Email queued for delivery")
+    
+    # Run the blocking SMTP exchange off the event loop
+    result = await asyncio.to_thread(email_sender.send_email, **email)
+    
     if result:
-        logger.info(f"Email sent successfully from {request.source_service} to {request.to}")
-        return {"status": "success", "message": "Email sent successfully"}
+        logger.info("Email sent successfully from %s to %s", request.source_service, request.to)
+        return EmailResponse(status="success", message="Email sent successfully")
     else:
-        logger.error(f"Failed to send email from {request.source_service} to {request.to}")
+        logger.error("Failed to send email from %s to %s", request.source_service, request.to)
         raise HTTPException(status_code=500, detail="Failed to send email")
 
 @app.post("/send-template")
-async def send_template_email_endpoint(request: TemplateEmailRequest):
-    """Send a templated email"""
-    logger.info(f"Sending template email {request.template_id} from {request.source_service} to {request.to}")
+async def send_template_email_endpoint(request: TemplateEmailRequest, background_tasks: BackgroundTasks, response: Response, sync: bool = False) -> EmailResponse:
+    """Send a templated email, queued in the background unless sync is set"""
+    logger.info("Sending template email %s from %s to %s", request.template_id, request.source_service, request.to)
     
     try:
         # Render template
@@ -660,14 +979,19 @@ async def send_template_email_endpoint(request: TemplateEmailRequest):
             template_data=request.template_data
         )
         
-        # Use subject from template or request
-        subject = request.subject or template_manager.get_template_subject(request.template_id)
-        # Replace variables in subject
-        for key, value in request.template_data.items():
-            subject = subject.replace(f"{{{{{key}}}}}", str(value))
+        # Use subject from request or template
+        if request.subject:
+            # Caller-supplied subjects are never compiled; replace variables literally
+            subject = request.subject
+            for key, value in request.template_data.items():
+                subject = subject.replace(f"{{{{{key}}}}}", str(value))
+        else:
+            subject = template_manager.render_subject(
+                template_manager.get_template_subject(request.template_id),
+                request.template_data
+            )
         
-        # Send email
-        result = email_sender.send_email(
+        email = dict(
             to_emails=request.to,
             subject=subject,
             html_content=html_content,
@@ -677,12 +1001,77 @@ async def send_template_email_endpoint(request: TemplateEmailRequest):
             bcc=request.bcc
         )
         
+        if not sync:
+            background_tasks.add_task(email_sender.send_email, **email)
+            response.status_code = 202
+            return EmailResponse(status="accepted", message="Template email queued for delivery")
+        
+        # Send email
+        result = await asyncio.to_thread(email_sender.send_email, **email)
+        
         if result:
-            logger.info(f"Template email sent successfully from {request.source_service} to {request.to}")
-            return {"status": "success", "message": "Template email sent successfully"}
+            logger.info("Template email sent successfully from %s to %s", request.source_service, request.to)
+            return EmailResponse(status="success", message="Template email sent successfully")
         else:
-            logger.error(f"Failed to send template email from {request.source_service} to {request.to}")
+            logger.error("Failed to send template email from %s to %s", request.source_service, request.to)
             raise HTTPException(status_code=500, detail="Failed to send template email")
     except Exception as e:
-        logger.error(f"Error processing template email: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing template: {str(e)}")
\ No newline at end of file
+        logger.error("Error processing template email: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error processing template: {str(e)}")
+
+# Trusted internal routes: the caller guarantees a well-formed body, so validation is skipped
+# Cheap shape checks for the fields the senders index into or iterate over
+TRUSTED_FIELD_TYPES = {
+    "to": list,
+    "cc": list,
+    "bcc": list,
+    "subject": str,
+    "body": str,
+    "html_body": str,
+    "sender": str,
+    "source_service": str,
+    "template_id": str,
+    "template_data": dict,
+    "attachments": list,
+}
+RECIPIENT_FIELDS = ("to", "cc", "bcc")
+
+async def construct_trusted_request(model, raw_request: Request):
+    """Build a request model without validation, checking only the body shape, required fields and field types"""
+    if os.environ.get("TRUSTED_ROUTES_ENABLED") != "True":
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        data = await raw_request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    
+    missing = [name for name, field in model.model_fields.items() if field.is_required() and name not in data]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing required fields: {', '.join(missing)}")
+    
+    mistyped = []
+    for name, field in model.model_fields.items():
+        value = data.get(name)
+        if value is None and not field.is_required():
+            continue
+        if not isinstance(value, TRUSTED_FIELD_TYPES.get(name, object)):
+            mistyped.append(name)
+        elif name in RECIPIENT_FIELDS and not all(isinstance(address, str) for address in value):
+            mistyped.append(name)
+    if mistyped:
+        raise HTTPException(status_code=422, detail=f"Invalid field types: {', '.join(mistyped)}")
+    return model.model_construct(**data)
+
+@app.post("/send/trusted", include_in_schema=False)
+async def send_email_trusted_endpoint(raw_request: Request, background_tasks: BackgroundTasks, response: Response, sync: bool = False) -> EmailResponse:
+    """Send a custom email built from an unvalidated internal request"""
+    request = await construct_trusted_request(EmailRequest, raw_request)
+    return await send_email_endpoint(request, background_tasks, response, sync)
+
+@app.post("/send-template/trusted", include_in_schema=False)
+async def send_template_email_trusted_endpoint(raw_request: Request, background_tasks: BackgroundTasks, response: Response, sync: bool = False) -> EmailResponse:
+    """Send a templated email built from an unvalidated internal request"""
+    request = await construct_trusted_request(TemplateEmailRequest, raw_request)
+    return await send_template_email_endpoint(request, background_tasks, response, sync)
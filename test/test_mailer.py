@@ -1,12 +1,14 @@
 # test_mailer_service.py
 import pytest
 import os
-import tempfile
-import shutil
 from unittest.mock import Mock, patch, MagicMock
 from fastapi.testclient import TestClient
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from pydantic import ValidationError
+from common_utils.logger.client import LoggerClient
 from pathlib import Path
 import smtplib
+import email
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
@@ -14,11 +16,11 @@ from email.mime.text import MIMEText
 from mailer_service.main import (
     app, EmailConfig, EmailSender, TemplateManager, 
     template_manager, email_sender, email_config,
-    EmailRequest, TemplateEmailRequest, ApplicationCreatedRequest,
+    PipeliningSMTP, build_msg, EmailRequest, TemplateEmailRequest, ApplicationCreatedRequest,
     ApplicationRejectedRequest, ApplicationApprovedRequest,
     ApplicationDeletedRequest, PaymentCreatedRequest,
     PaymentSuccessRequest, PaymentFailedRequest,
-    TEMPLATE_DIR
+    template_env, TEMPLATE_DIR
 )
 
 class TestEmailConfig:
@@ -27,7 +29,7 @@ class TestEmailConfig:
     def test_email_config_default_values(self):
         """Test EmailConfig with default values"""
         with patch.dict(os.environ, {}, clear=True):
-            config = EmailConfig()
+            config = EmailConfig.from_env()
             assert config.smtp_server == "sandbox.smtp.mailtrap.io"
             assert config.smtp_port == 2525
             assert config.smtp_username == ""
@@ -44,13 +46,19 @@ class TestEmailConfig:
             "DEFAULT_SENDER": "custom@example.com"
         }
         with patch.dict(os.environ, env_vars):
-            config = EmailConfig()
+            config = EmailConfig.from_env()
             assert config.smtp_server == "custom.smtp.com"
             assert config.smtp_port == 587
             assert config.smtp_username == "test_user"
             assert config.smtp_password == "test_pass"
             assert config.default_sender == "custom@example.com"
     
+    def test_email_config_frozen(self):
+        """Test that EmailConfig cannot be modified after creation"""
+        config = EmailConfig.from_env()
+        with pytest.raises(AttributeError):
+            config.smtp_port = 25
+    
     def test_email_config_strip_quotes(self):
         """Test that quotes are stripped from environment variables"""
         env_vars = {
@@ -59,23 +67,61 @@ class TestEmailConfig:
             "SMTP_PASSWORD": "'quoted_pass'"
         }
         with patch.dict(os.environ, env_vars):
-            config = EmailConfig()
+            config = EmailConfig.from_env()
             assert config.smtp_server == "quoted.server.com"
             assert config.smtp_username == "quoted_user"
             assert config.smtp_password == "quoted_pass"
 
 
+class FakeSMTP:
+    """Lightweight SMTP session stand-in that records (name, args, kwargs) calls
+    
+    errors maps a method name to a list consumed per call; a non-None entry is raised.
+    """
+    __slots__ = ("calls", "errors", "noop_reply")
+    
+    def __init__(self, errors=None, noop_reply=(250, b"OK")):
+        self.calls = []
+        self.errors = errors or {}
+        self.noop_reply = noop_reply
+    
+    def _record(self, name, args, kwargs):
+        self.calls.append((name, args, kwargs))
+        pending = self.errors.get(name)
+        if pending:
+            error = pending.pop(0)
+            if error is not None:
+                raise error
+    
+    def sendmail(self, *args, **kwargs):
+        self._record("sendmail", args, kwargs)
+        return {}
+    
+    def noop(self):
+        self._record("noop", (), {})
+        return self.noop_reply
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._record(name, args, kwargs)
+    
+    def names(self):
+        return [name for name, _, _ in self.calls]
+    
+    def calls_to(self, name):
+        return [(args, kwargs) for called, args, kwargs in self.calls if called == name]
+
+
 class TestEmailSender:
     """Test EmailSender class"""
     
     def setup_method(self):
         """Setup for each test"""
-        self.config = EmailConfig()
+        self.config = EmailConfig.from_env()
         self.sender = EmailSender(self.config)
     
     def test_email_sender_init_with_config(self):
         """Test EmailSender initialization with config"""
-        config = EmailConfig()
+        config = EmailConfig.from_env()
         sender = EmailSender(config)
         assert sender.config == config
     
@@ -112,11 +158,11 @@ class TestEmailSender:
         )
         assert result is True
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_success_single_recipient(self, mock_smtp):
         """Test successful email sending with single recipient"""
-        mock_server = Mock()
-        mock_smtp.return_value = mock_server
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
         
         result = self.sender.send_email(
             to_emails="test@example.com",
@@ -127,18 +173,87 @@ class TestEmailSender:
         
         assert result is True
         mock_smtp.assert_called_once_with(self.config.smtp_server, self.config.smtp_port, timeout=30)
-        mock_server.set_debuglevel.assert_called_once_with(1)
-        mock_server.ehlo.assert_called()
-        mock_server.starttls.assert_called_once()
-        mock_server.login.assert_called_once_with(self.config.smtp_username, self.config.smtp_password)
-        mock_server.sendmail.assert_called_once()
-        mock_server.quit.assert_called_once()
-    
-    @patch('smtplib.SMTP')
+        assert fake_server.names() == ["ehlo", "starttls", "ehlo", "login", "sendmail"]
+        assert fake_server.calls_to("login") == [((self.config.smtp_username, self.config.smtp_password), {})]
+    
+    @patch.dict(os.environ, {"SMTP_DEBUG": "1"})
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_smtp_debug(self, mock_smtp):
+        """Test that SMTP_DEBUG enables the smtplib protocol trace"""
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
+        sender = EmailSender(self.config)
+        
+        result = sender.send_email(
+            to_emails="test@example.com",
+            subject="Test Subject",
+            html_content="<p>Test HTML</p>"
+        )
+        
+        assert result is True
+        assert fake_server.calls_to("set_debuglevel") == [((1,), {})]
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_reuses_pooled_connection(self, mock_smtp):
+        """Test that consecutive sends share one SMTP session"""
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
+        
+        for _ in range(2):
+            result = self.sender.send_email(
+                to_emails="test@example.com",
+                subject="Test Subject",
+                html_content="<p>Test HTML</p>"
+            )
+            assert result is True
+        
+        mock_smtp.assert_called_once()
+        assert fake_server.names() == ["ehlo", "starttls", "ehlo", "login", "sendmail", "noop", "sendmail"]
+        
+        self.sender.pool.close()
+        assert fake_server.names()[-1] == "quit"
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_reconnects_stale_connection(self, mock_smtp):
+        """Test that a pooled session failing its health check is replaced"""
+        stale_server = FakeSMTP(errors={"noop": [smtplib.SMTPServerDisconnected("Gone")]})
+        fresh_server = FakeSMTP()
+        mock_smtp.return_value = fresh_server
+        self.sender.pool.release(stale_server)
+        
+        result = self.sender.send_email(
+            to_emails="test@example.com",
+            subject="Test Subject",
+            html_content="<p>Test HTML</p>"
+        )
+        
+        assert result is True
+        assert "sendmail" not in stale_server.names()
+        assert len(fresh_server.calls_to("sendmail")) == 1
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_reconnects_timed_out_connection(self, mock_smtp):
+        """Test that a pooled session answering NOOP with 421 is replaced"""
+        stale_server = FakeSMTP(noop_reply=(421, b"Idle timeout"))
+        fresh_server = FakeSMTP()
+        mock_smtp.return_value = fresh_server
+        self.sender.pool.release(stale_server)
+        
+        result = self.sender.send_email(
+            to_emails="test@example.com",
+            subject="Test Subject",
+            html_content="<p>Test HTML</p>"
+        )
+        
+        assert result is True
+        assert stale_server.names() == ["noop", "quit"]
+        assert len(fresh_server.calls_to("sendmail")) == 1
+    
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_success_multiple_recipients(self, mock_smtp):
         """Test successful email sending with multiple recipients"""
-        mock_server = Mock()
-        mock_smtp.return_value = mock_server
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
         
         result = self.sender.send_email(
             to_emails=["test1@example.com", "test2@example.com"],
@@ -147,13 +262,13 @@ class TestEmailSender:
         )
         
         assert result is True
-        mock_server.sendmail.assert_called_once()
+        assert len(fake_server.calls_to("sendmail")) == 1
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_with_cc_bcc(self, mock_smtp):
         """Test email sending with CC and BCC"""
-        mock_server = Mock()
-        mock_smtp.return_value = mock_server
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
         
         result = self.sender.send_email(
             to_emails=["test@example.com"],
@@ -166,17 +281,17 @@ class TestEmailSender:
         
         assert result is True
         # Verify that sendmail was called with all recipients
-        args, kwargs = mock_server.sendmail.call_args
+        [(args, kwargs)] = fake_server.calls_to("sendmail")
         all_recipients = args[1]
         assert "test@example.com" in all_recipients
         assert "cc@example.com" in all_recipients
         assert "bcc@example.com" in all_recipients
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_with_cc_bcc_strings(self, mock_smtp):
         """Test email sending with CC and BCC as strings"""
-        mock_server = Mock()
-        mock_smtp.return_value = mock_server
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
         
         result = self.sender.send_email(
             to_emails="test@example.com",
@@ -187,12 +302,96 @@ class TestEmailSender:
         )
         
         assert result is True
+        [(args, kwargs)] = fake_server.calls_to("sendmail")
+        assert args[1] == ["test@example.com", "cc@example.com", "bcc@example.com"]
+        assert isinstance(args[2], bytes)
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_str_subclass_recipient(self, mock_smtp):
+        """Test that a str subclass is treated as a single address"""
+        class Address(str):
+            pass
+        
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
+        
+        result = self.sender.send_email(
+            to_emails=Address("test@example.com"),
+            subject="Test Subject",
+            html_content="<p>Test HTML</p>"
+        )
+        
+        assert result is True
+        [(args, kwargs)] = fake_server.calls_to("sendmail")
+        assert args[1] == ["test@example.com"]
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_bulk_shares_connection(self, mock_smtp):
+        """Test bulk sending over one SMTP session"""
+        fake_server = FakeSMTP(errors={"sendmail": [None, smtplib.SMTPRecipientsRefused({}), None]})
+        mock_smtp.return_value = fake_server
+        
+        results = self.sender.send_bulk([
+            {"to_emails": "a@example.com", "subject": "A", "html_content": "<p>A</p>"},
+            {"to_emails": "b@example.com", "subject": "B", "html_content": "<p>B</p>"},
+            {"to_emails": [], "subject": "Empty", "html_content": "<p>Empty</p>"},
+            {"to_emails": ["c@example.com"], "subject": "C", "html_content": "<p>C</p>", "cc": "cc@example.com"},
+        ])
+        
+        assert results == [True, False, False, True]
+        mock_smtp.assert_called_once()
+        sendmail_calls = fake_server.calls_to("sendmail")
+        assert len(sendmail_calls) == 3
+        args, kwargs = sendmail_calls[-1]
+        assert args[1] == ["c@example.com", "cc@example.com"]
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_email_invalid_header(self, mock_smtp):
+        """Test that a message that cannot be serialized fails instead of raising"""
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
+        
+        result = self.sender.send_email(
+            to_emails="test@example.com",
+            subject="Hi\nBcc: x@example.com",
+            html_content="<p>Test HTML</p>"
+        )
+        
+        assert result is False
+        assert fake_server.calls_to("sendmail") == []
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_bulk_malformed_message(self, mock_smtp):
+        """Test that a malformed message does not stop the rest of the batch"""
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
+        
+        results = self.sender.send_bulk([
+            {"to_emails": "a@example.com", "subject": "Hi\nBcc: x@example.com", "html_content": "<p>A</p>"},
+            {"to_emails": "b@example.com", "subject": "B", "html_content": "<p>B</p>", "reply_to": "r@example.com"},
+            {"to_emails": "c@example.com", "subject": "C", "html_content": "<p>C</p>"},
+        ])
+        
+        assert results == [False, False, True]
+        [(args, kwargs)] = fake_server.calls_to("sendmail")
+        assert args[1] == ["c@example.com"]
+    
+    @patch('mailer_service.main.PipeliningSMTP')
+    def test_send_bulk_connection_error(self, mock_smtp):
+        """Test bulk sending when the SMTP connection cannot be opened"""
+        mock_smtp.side_effect = smtplib.SMTPException("SMTP Error")
+        
+        results = self.sender.send_bulk([
+            {"to_emails": "a@example.com", "subject": "A", "html_content": "<p>A</p>"},
+        ])
+        
+        assert results == [False]
+    
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_no_text_content(self, mock_smtp):
         """Test email sending without text content"""
-        mock_server = Mock()
-        mock_smtp.return_value = mock_server
+        fake_server = FakeSMTP()
+        mock_smtp.return_value = fake_server
         
         result = self.sender.send_email(
             to_emails=["test@example.com"],
@@ -202,7 +401,7 @@ class TestEmailSender:
         
         assert result is True
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_smtp_exception(self, mock_smtp):
         """Test email sending with SMTP exception"""
         mock_smtp.side_effect = smtplib.SMTPException("SMTP Error")
@@ -215,7 +414,7 @@ class TestEmailSender:
         
         assert result is False
     
-    @patch('smtplib.SMTP')
+    @patch('mailer_service.main.PipeliningSMTP')
     def test_send_email_general_exception(self, mock_smtp):
         """Test email sending with general exception"""
         mock_smtp.side_effect = Exception("General Error")
@@ -229,22 +428,92 @@ class TestEmailSender:
         assert result is False
 
 
+class TestBuildMsg:
+    """Test build_msg function"""
+
+    def test_build_msg_reuses_skeleton(self):
+        """Test that a reused skeleton carries no state from the previous message"""
+        first = build_msg("First", "from@example.com", "to@example.com", "<p>First</p>", "First", cc_hdr="cc@example.com")
+        first.as_bytes()
+        second = build_msg("Second", "from@example.com", "to@example.com", "<p>Zweite Größe</p>", "Second")
+
+        raw = second.as_bytes()
+        assert b"\r\n" in raw and b"\n" not in raw.replace(b"\r\n", b"")
+
+        parsed = email.message_from_bytes(raw)
+        text_part, html_part = parsed.get_payload()
+        assert parsed["Subject"] == "Second"
+        assert parsed["Cc"] is None
+        assert text_part.get_payload(decode=True).decode("utf-8") == "Second"
+        assert html_part.get_payload(decode=True).decode("utf-8") == "<p>Zweite Größe</p>"
+    
+    def test_build_msg_empty_subject(self):
+        """Test that an empty subject still produces a Subject header"""
+        msg = build_msg("", "from@example.com", "to@example.com", "<p>Body</p>", "Body", cc_hdr="")
+
+        parsed = email.message_from_bytes(msg.as_bytes())
+        assert parsed["Subject"] == ""
+        assert parsed["Cc"] is None
+
+
+class TestPipeliningSMTP:
+    """Test PipeliningSMTP class"""
+
+    def setup_method(self):
+        """Setup for each test"""
+        # Unconnected client that looks like it already completed EHLO
+        self.server = PipeliningSMTP()
+        self.server.ehlo_resp = b"OK"
+        self.server.does_esmtp = True
+        self.server.putcmd = Mock()
+        self.server.send = Mock()
+        self.server.getreply = Mock()
+
+    def test_sendmail_pipelines_envelope(self):
+        """Test that envelope commands are sent before any reply is read"""
+        self.server.esmtp_features = {"pipelining": ""}
+        self.server.getreply.side_effect = [
+            (250, b"OK"), (250, b"OK"), (550, b"No such user"), (354, b"Go ahead"), (250, b"Queued")
+        ]
+
+        senderrs = self.server.sendmail(
+            "from@example.com", ["a@example.com", "b@example.com"], "Subject: Test\r\n\r\nBody"
+        )
+
+        assert senderrs == {"b@example.com": (550, b"No such user")}
+        assert [c.args[0] for c in self.server.putcmd.call_args_list] == ["mail", "rcpt", "rcpt", "data"]
+        self.server.send.assert_called_once_with(b"Subject: Test\r\n\r\nBody\r\n.\r\n")
+
+    def test_sendmail_recipients_refused(self):
+        """Test that refusing every recipient aborts the pipelined transaction"""
+        self.server.esmtp_features = {"pipelining": ""}
+        self.server.getreply.side_effect = [(250, b"OK"), (550, b"No such user"), (554, b"No valid recipients")]
+        self.server._rset = Mock()
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            self.server.sendmail("from@example.com", ["a@example.com"], "Body")
+
+        self.server.send.assert_not_called()
+        self.server._rset.assert_called_once()
+
+    @patch('smtplib.SMTP.sendmail')
+    def test_sendmail_without_pipelining(self, mock_sendmail):
+        """Test fallback to the stock sendmail when PIPELINING is not advertised"""
+        self.server.esmtp_features = {}
+
+        self.server.sendmail("from@example.com", ["a@example.com"], "Body")
+
+        mock_sendmail.assert_called_once()
+        self.server.putcmd.assert_not_called()
+
+
 class TestTemplateManager:
     """Test TemplateManager class"""
     
     def setup_method(self):
         """Setup for each test"""
-        # Create a temporary directory for templates
-        self.temp_dir = tempfile.mkdtemp()
-        self.original_template_dir = TEMPLATE_DIR
-        
-        # Patch TEMPLATE_DIR
         self.template_manager = TemplateManager()
     
-    def teardown_method(self):
-        """Cleanup after each test"""
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
     def test_template_manager_init(self):
         """Test TemplateManager initialization"""
         tm = TemplateManager()
@@ -267,6 +536,31 @@ class TestTemplateManager:
         """Test getting subject for non-existing template"""
         subject = self.template_manager.get_template_subject("non_existing")
         assert subject == "Notification"
+
+    def test_get_compiled_subject(self):
+        """Test compiled subject rendering and caching"""
+        subject = "Payment Created: {{payment_id}}"
+        compiled = self.template_manager.get_compiled_subject(subject)
+
+        assert compiled is self.template_manager.get_compiled_subject(subject)
+        assert compiled.render({"payment_id": "PAY&123"}) == "Payment Created: PAY&123"
+    
+    def test_render_subject_single_variable(self):
+        """Test that single-variable default subjects render without Jinja"""
+        subject = self.template_manager.get_template_subject("payment_created")
+        
+        with patch.object(self.template_manager, 'get_compiled_subject') as mock_compiled:
+            rendered = self.template_manager.render_subject(subject, {"payment_id": "PAY123"})
+        
+        assert rendered == "Payment Created: PAY123"
+        mock_compiled.assert_not_called()
+    
+    def test_render_subject_falls_back_to_jinja(self):
+        """Test subject rendering for custom subjects and missing variables"""
+        assert self.template_manager.render_subject(
+            "Payment {{payment_id}} for {{service_name}}", {"payment_id": "PAY123", "service_name": "Room"}
+        ) == "Payment PAY123 for Room"
+        assert self.template_manager.render_subject("Payment Created: {{payment_id}}", {}) == "Payment Created: {{payment_id}}"
     
     def test_render_template_success(self):
         """Test successful template rendering"""
@@ -342,24 +636,52 @@ class TestTemplateManager:
         assert html_content == "<html>Test</html>"
         assert "HTML-compatible email client" in text_content
 
+    def test_render_template_known_template_prebound(self):
+        """Test that known templates render without going back to the loader"""
+        assert set(self.template_manager._renderers) == set(self.template_manager.templates)
+        
+        with patch('mailer_service.main.template_env.get_template') as mock_get_template:
+            html_content, text_content = self.template_manager.render_template(
+                "payment_failed", {"payment_id": "PAY123", "reason": "Card declined"}
+            )
+        
+        mock_get_template.assert_not_called()
+        assert "Card declined" in html_content
+        assert "Card declined" in text_content
+
+    @patch('mailer_service.main.template_env.get_template')
+    def test_render_template_caches_compiled_templates(self, mock_get_template):
+        """Test that compiled templates are loaded once and reused"""
+        mock_get_template.return_value = Mock(render=Mock(return_value="Rendered"))
+
+        self.template_manager.render_template("test_template", {})
+        self.template_manager.render_template("test_template", {})
+
+        assert mock_get_template.call_count == 2
+        mock_get_template.assert_any_call("test_template.html")
+        mock_get_template.assert_any_call("test_template.txt")
+
 
 class TestAPIEndpoints:
     """Test FastAPI endpoints"""
     
-    def setup_method(self):
-        """Setup for each test"""
-        self.client = TestClient(app)
+    @pytest.fixture(scope="class")
+    @classmethod
+    def client(cls):
+        """Shared test client for the whole class"""
+        with TestClient(app) as c:
+            yield c
     
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test root endpoint"""
-        response = self.client.get("/")
+        response = client.get("/")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "ok"
         assert data["service"] == "email-service"
     
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_email_endpoint_success(self, mock_send_email):
+    def test_send_email_endpoint_success(self, mock_send_email, client):
         """Test successful email sending endpoint"""
         mock_send_email.return_value = True
         
@@ -371,7 +693,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send", json=email_data)
+        response = client.post("/send?sync=true", json=email_data)
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
@@ -388,7 +710,27 @@ class TestAPIEndpoints:
         )
     
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_email_endpoint_no_html_body(self, mock_send_email):
+    def test_send_email_endpoint_background(self, mock_send_email, client):
+        """Test email sending endpoint queues delivery by default"""
+        mock_send_email.return_value = True
+        
+        email_data = {
+            "to": ["test@example.com"],
+            "subject": "Test Subject",
+            "body": "Test Body",
+            "source_service": "test-service"
+        }
+        
+        response = client.post("/send", json=email_data)
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "accepted"
+        
+        # TestClient runs background tasks before returning the response
+        mock_send_email.assert_called_once()
+    
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_email_endpoint_no_html_body(self, mock_send_email, client):
         """Test email sending endpoint without HTML body"""
         mock_send_email.return_value = True
         
@@ -399,7 +741,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send", json=email_data)
+        response = client.post("/send?sync=true", json=email_data)
         assert response.status_code == 200
         
         mock_send_email.assert_called_once_with(
@@ -413,7 +755,7 @@ class TestAPIEndpoints:
         )
     
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_email_endpoint_with_optional_fields(self, mock_send_email):
+    def test_send_email_endpoint_with_optional_fields(self, mock_send_email, client):
         """Test email sending endpoint with all optional fields"""
         mock_send_email.return_value = True
         
@@ -428,7 +770,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send", json=email_data)
+        response = client.post("/send?sync=true", json=email_data)
         assert response.status_code == 200
         
         mock_send_email.assert_called_once_with(
@@ -444,7 +786,7 @@ class TestAPIEndpoints:
     @patch('mailer_service.main.template_manager.render_template')
     @patch('mailer_service.main.template_manager.get_template_subject')
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_template_email_endpoint_success(self, mock_send_email, mock_get_subject, mock_render):
+    def test_send_template_email_endpoint_success(self, mock_send_email, mock_get_subject, mock_render, client):
         """Test successful template email sending endpoint"""
         mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
         mock_get_subject.return_value = "Template Subject: {{payment_id}}"
@@ -457,7 +799,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
@@ -471,7 +813,27 @@ class TestAPIEndpoints:
     
     @patch('mailer_service.main.template_manager.render_template')
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_template_email_endpoint_send_failure(self, mock_send_email, mock_render):
+    def test_send_template_email_endpoint_background(self, mock_send_email, mock_render, client):
+        """Test template email endpoint queues delivery by default"""
+        mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
+        mock_send_email.return_value = False
+        
+        template_data = {
+            "to": ["test@example.com"],
+            "template_id": "payment_created",
+            "template_data": {"payment_id": "PAY123"},
+            "source_service": "test-service"
+        }
+        
+        response = client.post("/send-template", json=template_data)
+        assert response.status_code == 202
+        assert response.json()["status"] == "accepted"
+        mock_send_email.assert_called_once()
+        assert mock_send_email.call_args[1]["subject"] == "Payment Created: PAY123"
+    
+    @patch('mailer_service.main.template_manager.render_template')
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_template_email_endpoint_send_failure(self, mock_send_email, mock_render, client):
         """Test template email endpoint with send failure"""
         mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
         mock_send_email.return_value = False
@@ -483,7 +845,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 500
         data = response.json()
         assert data["detail"] == "Error processing template: 500: Failed to send template email"
@@ -491,7 +853,7 @@ class TestAPIEndpoints:
    
     @patch('mailer_service.main.template_manager.render_template')
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_template_email_endpoint_custom_subject(self, mock_send_email, mock_render):
+    def test_send_template_email_endpoint_custom_subject(self, mock_send_email, mock_render, client):
         """Test template email endpoint with custom subject"""
         mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
         mock_send_email.return_value = True
@@ -504,17 +866,39 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 200
         
         # Verify send_email was called with custom subject
         args, kwargs = mock_send_email.call_args
         assert kwargs["subject"] == "Custom Subject"
     
+    @patch('mailer_service.main.template_manager.render_template')
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_template_email_endpoint_custom_subject_not_compiled(self, mock_send_email, mock_render, client):
+        """Test that a custom subject is only substituted literally, never run as a template"""
+        mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
+        mock_send_email.return_value = True
+        
+        subject = "{{payment_id}}: Save 20% {{ coupon {{ cycler.__init__.__globals__ }} {{missing}}"
+        template_data = {
+            "to": ["test@example.com"],
+            "template_id": "payment_created",
+            "template_data": {"payment_id": "PAY123"},
+            "subject": subject,
+            "source_service": "test-service"
+        }
+        
+        response = client.post("/send-template?sync=true", json=template_data)
+        assert response.status_code == 200
+        
+        args, kwargs = mock_send_email.call_args
+        assert kwargs["subject"] == subject.replace("{{payment_id}}", "PAY123")
+    
     @patch('mailer_service.main.template_manager.render_template')
     @patch('mailer_service.main.template_manager.get_template_subject')
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_template_email_endpoint_subject_replacement(self, mock_send_email, mock_get_subject, mock_render):
+    def test_send_template_email_endpoint_subject_replacement(self, mock_send_email, mock_get_subject, mock_render, client):
         """Test template email endpoint with subject variable replacement"""
         mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
         mock_get_subject.return_value = "Payment: {{payment_id}} - {{amount}}"
@@ -527,7 +911,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 200
         
         # Verify subject variables were replaced
@@ -536,7 +920,7 @@ class TestAPIEndpoints:
     
     @patch('mailer_service.main.template_manager.render_template')
     @patch('mailer_service.main.email_sender.send_email')
-    def test_send_template_email_endpoint_with_optional_fields(self, mock_send_email, mock_render):
+    def test_send_template_email_endpoint_with_optional_fields(self, mock_send_email, mock_render, client):
         """Test template email endpoint with optional fields"""
         mock_render.return_value = ("<p>Rendered HTML</p>", "Rendered Text")
         mock_send_email.return_value = True
@@ -551,7 +935,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 200
         
         mock_send_email.assert_called_once_with(
@@ -564,8 +948,85 @@ class TestAPIEndpoints:
             bcc=["bcc@example.com"]
         )
     
+    @patch.dict(os.environ, {"TRUSTED_ROUTES_ENABLED": "True"})
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_email_trusted_endpoint(self, mock_send_email, client):
+        """Test trusted email endpoint builds the request without validation"""
+        mock_send_email.return_value = True
+        
+        email_data = {
+            "to": ["test@example.com"],
+            "subject": "Test Subject",
+            "body": "Test Body",
+            "source_service": "test-service"
+        }
+        
+        response = client.post("/send/trusted?sync=true", json=email_data)
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        mock_send_email.assert_called_once_with(
+            to_emails=["test@example.com"],
+            subject="Test Subject",
+            html_content="Test Body",
+            text_content="Test Body",
+            from_email=None,
+            cc=None,
+            bcc=None
+        )
+    
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_email_trusted_endpoint_disabled(self, mock_send_email, client):
+        """Test trusted endpoints are hidden unless TRUSTED_ROUTES_ENABLED is set"""
+        with patch.dict(os.environ, {"TRUSTED_ROUTES_ENABLED": ""}):
+            response = client.post("/send/trusted?sync=true", json={"to": ["test@example.com"]})
+            assert response.status_code == 404
+            assert client.post("/send-template/trusted?sync=true", json={}).status_code == 404
+        mock_send_email.assert_not_called()
+    
+    @patch.dict(os.environ, {"TRUSTED_ROUTES_ENABLED": "True"})
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_email_trusted_endpoint_bad_body(self, mock_send_email, client):
+        """Test trusted email endpoint rejects malformed bodies instead of failing later"""
+        missing_field = client.post("/send/trusted?sync=true", json={"to": ["test@example.com"], "subject": "Test", "body": "Test"})
+        assert missing_field.status_code == 422
+        assert "source_service" in missing_field.json()["detail"]
+        
+        assert client.post("/send/trusted?sync=true", json=["not", "an", "object"]).status_code == 400
+        assert client.post("/send-template/trusted?sync=true", content=b"{not json").status_code == 400
+        mock_send_email.assert_not_called()
+    
+    @patch.dict(os.environ, {"TRUSTED_ROUTES_ENABLED": "True"})
+    @patch('mailer_service.main.email_sender.send_email')
+    def test_send_email_trusted_endpoint_mistyped_field(self, mock_send_email, client):
+        """Test trusted endpoints reject mistyped fields with 422 instead of crashing"""
+        email_data = {
+            "to": 5,
+            "cc": 7,
+            "subject": 3,
+            "body": "Test Body",
+            "source_service": "test-service"
+        }
+        
+        response = client.post("/send/trusted?sync=true", json=email_data)
+        assert response.status_code == 422
+        assert response.json()["detail"] == "Invalid field types: to, subject, cc"
+        
+        email_data = {"to": ["test@example.com", 1], "subject": "Test", "body": "Test", "source_service": "test-service"}
+        assert client.post("/send/trusted?sync=true", json=email_data).status_code == 422
+        
+        template_request = {
+            "to": ["test@example.com"],
+            "template_id": "payment_created",
+            "template_data": ["not", "a", "dict"],
+            "source_service": "test-service"
+        }
+        response = client.post("/send-template/trusted?sync=true", json=template_request)
+        assert response.status_code == 422
+        assert "template_data" in response.json()["detail"]
+        mock_send_email.assert_not_called()
+    
     @patch('mailer_service.main.template_manager.render_template')
-    def test_send_template_email_endpoint_render_error(self, mock_render):
+    def test_send_template_email_endpoint_render_error(self, mock_render, client):
         """Test template email endpoint with rendering error"""
         mock_render.side_effect = Exception("Template error")
         
@@ -576,7 +1037,7 @@ class TestAPIEndpoints:
             "source_service": "test-service"
         }
         
-        response = self.client.post("/send-template", json=template_data)
+        response = client.post("/send-template?sync=true", json=template_data)
         assert response.status_code == 500
         data = response.json()
         assert "Error processing template" in data["detail"]
@@ -623,6 +1084,12 @@ class TestPydanticModels:
         assert request.sender == "sender@example.com"
         assert request.attachments == [{"name": "file.txt", "content": "content"}]
     
+    def test_email_request_model_frozen(self):
+        """Test that parsed requests cannot be modified"""
+        request = EmailRequest(to=["test@example.com"], subject="Test", body="Test body", source_service="test-service")
+        with pytest.raises(ValidationError):
+            request.subject = "Changed"
+    
     def test_template_email_request_model(self):
         """Test TemplateEmailRequest model"""
         data = {
@@ -735,6 +1202,58 @@ class TestPydanticModels:
         assert request.reason == "Card declined"
 
 
+class TestLoggerClient:
+    """Test LoggerClient class"""
+    
+    def setup_method(self):
+        """Setup for each test"""
+        self.client = LoggerClient("test-service", logger_url="http://logger", level="INFO")
+    
+    def sent(self, mock_post):
+        """Return the log payload of the last request"""
+        return mock_post.call_args[1]["json"]
+    
+    @patch('common_utils.logger.client.requests.post')
+    def test_level_threshold(self, mock_post):
+        """Test that messages below LOG_LEVEL are neither formatted nor sent"""
+        assert self.client.debug("skipped %s", object()) is False
+        mock_post.assert_not_called()
+        
+        with patch.dict(os.environ, {"LOG_LEVEL": "error"}):
+            client = LoggerClient("test-service", logger_url="http://logger")
+        client.warning("skipped")
+        mock_post.assert_not_called()
+        
+        client.error("sent")
+        assert self.sent(mock_post)["message"] == "sent"
+    
+    @patch('common_utils.logger.client.requests.post')
+    def test_format_arguments(self, mock_post):
+        """Test %-style arguments alongside keyword details"""
+        self.client.info("Sent %s to %s", "mail", ["a@example.com"], details={"id": 1})
+        
+        payload = self.sent(mock_post)
+        assert payload["message"] == "Sent mail to ['a@example.com']"
+        assert payload["details"] == {"id": 1}
+    
+    @patch('common_utils.logger.client.requests.post')
+    def test_positional_details(self, mock_post):
+        """Test the original info(message, details) call style"""
+        self.client.info("user created", {"id": 1})
+        assert self.sent(mock_post)["message"] == "user created"
+        assert self.sent(mock_post)["details"] == {"id": 1}
+        
+        self.client.info("Upload 100% complete", {"file": "a.csv"})
+        assert self.sent(mock_post)["message"] == "Upload 100% complete"
+        assert self.sent(mock_post)["details"] == {"file": "a.csv"}
+    
+    @patch('common_utils.logger.client.requests.post')
+    def test_bad_format_string(self, mock_post):
+        """Test that a bad format string keeps its arguments and does not raise"""
+        self.client.error("Failed %d of %d", "one", "two")
+        assert self.sent(mock_post)["message"] == "Failed %d of %d ('one', 'two')"
+
+
 class TestGlobalVariables:
     """Test global variables and initialization"""
     
@@ -746,5 +1265,23 @@ class TestGlobalVariables:
         """Test global email_sender variable"""
         assert isinstance(email_sender, EmailSender)
         assert email_sender.config == email_config
+    
+    def test_global_template_env_bytecode_cache(self):
+        """Test that compiled templates are persisted to the bytecode cache"""
+        assert isinstance(template_env.bytecode_cache, FileSystemBytecodeCache)
+    
+    def test_bytecode_cache_persists_and_reuses(self, tmp_path):
+        """Test that a compiled template is written to the cache dir and reused by a new environment"""
+        def fresh_env():
+            return Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=FileSystemBytecodeCache(str(tmp_path)))
+        
+        fresh_env().get_template("payment_created.html")
+        cache_files = list(tmp_path.glob("__jinja2_*.cache"))
+        assert len(cache_files) == 1
+        
+        with patch.object(Environment, "compile", side_effect=AssertionError("template was recompiled")):
+            template = fresh_env().get_template("payment_created.html")
+        assert template.render() is not None
+        assert list(tmp_path.glob("__jinja2_*.cache")) == cache_files
 
 